@@ -0,0 +1,63 @@
+// Grow the question input with its content, up to 60% of the viewport.
+// Resizes are coalesced into one animation frame so typing never forces more
+// than one layout per frame, and the listener is only installed once per page.
+(() => {
+    if (window.__ta_bound) return;
+    window.__ta_bound = true;
+
+    let frame = 0;
+    const resize = () => {
+        if (frame) return;
+        frame = requestAnimationFrame(() => {
+            frame = 0;
+            const ta = document.getElementById('input-textarea');
+            if (!ta) return;
+            ta.style.height = 'auto';
+            const maxHeight = window.innerHeight * 0.6;
+            const height = Math.min(ta.scrollHeight, maxHeight);
+            ta.style.height = height + 'px';
+            ta.style.overflowY = ta.scrollHeight > maxHeight ? 'auto' : 'hidden';
+        });
+    };
+
+    document.addEventListener('input', (event) => {
+        const ta = event.target;
+        if (ta.id !== 'input-textarea') return;
+        // Also re-fit when the input is re-wrapped by a width change.
+        if (!ta.__observed) {
+            ta.__observed = true;
+            new ResizeObserver(resize).observe(ta);
+        }
+        resize();
+    }, { passive: true });
+
+    // Sending a question clears the input from the backend, which sets the
+    // value without an input event, so watch for the value to change for a
+    // short while after a send and re-fit the shrunken input.
+    let watch = 0;
+    const refitOnClear = () => {
+        const ta = document.getElementById('input-textarea');
+        if (!ta) return;
+        const sent = ta.value;
+        cancelAnimationFrame(watch);
+        const started = performance.now();
+        const check = () => {
+            if (ta.value !== sent) {
+                watch = 0;
+                resize();
+            } else if (performance.now() - started < 2000) {
+                watch = requestAnimationFrame(check);
+            }
+        };
+        watch = requestAnimationFrame(check);
+    };
+
+    document.addEventListener('submit', refitOnClear, { passive: true });
+    document.addEventListener('keydown', (event) => {
+        // Ctrl+Enter sends the question from the backend's key handler.
+        if (event.target.id === 'input-textarea'
+            && event.key === 'Enter' && event.ctrlKey) {
+            refitOnClear();
+        }
+    }, { passive: true });
+})();
@@ -0,0 +1,34 @@
+// Scroll the chat to its bottom. Defined once per page so that the backend
+// only has to send a short call instead of the whole script, and coalesced
+// so that at most one scroll happens per frame however many tokens arrive.
+(() => {
+    if (window.__scrollChat) return;
+
+    let frame = 0;
+    window.__scrollChat = () => {
+        if (frame) return;
+        frame = requestAnimationFrame(() => {
+            frame = 0;
+            const chatContainer = document.getElementById('chat-container');
+            if (chatContainer) {
+                chatContainer.scrollTop = chatContainer.scrollHeight;
+            }
+        });
+    };
+
+    // Load earlier history once the chat is scrolled near its top. The check
+    // runs here so that scrolling only reaches the backend when it has
+    // something to load: the trigger is only rendered while earlier history
+    // exists, and is clicked at most once every 200ms.
+    let lastLoad = 0;
+    document.addEventListener('scroll', (event) => {
+        if (event.target.id !== 'chat-container') return;
+        const trigger = document.getElementById('load-earlier');
+        if (!trigger) return;
+        if (event.target.scrollTop >= Number(trigger.dataset.scrollTop)) return;
+        const now = performance.now();
+        if (now - lastLoad < 200) return;
+        lastLoad = now;
+        trigger.click();
+    }, { capture: true, passive: true });
+})();
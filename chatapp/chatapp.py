@@ -3,6 +3,8 @@
 import reflex as rx
 
 from chatapp.components import chat, sidebar, action_bar
+from chatapp.state import LOAD_EARLIER_SCROLL_TOP, State, close_client_on_shutdown
+from chatapp import style
 
 
 def index() -> rx.Component:
@@ -12,16 +14,12 @@ def index() -> rx.Component:
         rx.box(
             rx.vstack(
                 rx.cond(
-                    ~chat.State.chat_history.length(),
+                    ~State.has_history,
                     rx.heading(
                         "お手伝いできることはありますか?",
                         size="8",
-                        color="black",
-                        text_align="center",
-                        margin_top="20%",
-                        margin_bottom="5%",
+                        style=style.greeting_style,
                     ),
-                    rx.box(),
                 ),
                 chat.chat(),
                 action_bar.action_bar(),
@@ -29,7 +27,19 @@ def index() -> rx.Component:
                 spacing="4",
                 width="100%",
             ),
-            style=chat.chat_style,
+            # Clicked by scroll.js once the chat is scrolled near its top,
+            # and only rendered while there is earlier history to load.
+            rx.cond(
+                State.visible_start > 0,
+                rx.box(
+                    id="load-earlier",
+                    on_click=State.load_earlier,
+                    display="none",
+                    custom_attrs={"data-scroll-top": LOAD_EARLIER_SCROLL_TOP},
+                ),
+            ),
+            rx.script(src="/scroll.js", strategy="afterInteractive"),
+            style=style.chat_style,
             id="chat-container",
         ),
         rx.box(),  # Empty box for third column
@@ -48,3 +58,4 @@ app = rx.App(
     )
 )
 app.add_page(index)
+app.register_lifespan_task(close_client_on_shutdown)
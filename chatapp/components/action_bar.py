@@ -1,9 +1,64 @@
 """Action bar component for user input."""
 
+from types import MappingProxyType
+
 import reflex as rx
-from chatapp.state import State
+from chatapp.state import MODELS, State
 from chatapp import style
 
+_MODELS_LIST = list(MODELS)
+
+# Milliseconds of typing pause before a text area syncs to the backend
+INPUT_DEBOUNCE_TIMEOUT = 120
+
+_ICON_BUTTON_STYLE = MappingProxyType(
+    dict(
+        background_color="transparent",
+        border="0px solid #E9E9E9",
+        color="black",
+    )
+)
+
+_STOP_ICON = rx.icon("circle-stop", color="crimson")
+_SEND_ICON = rx.icon("arrow-right")
+
+
+def model_select(model: rx.Var[str], processing: rx.Var[bool]) -> rx.Component:
+    """The model picker shared by the action bar and the question editor."""
+    return rx.select(
+        _MODELS_LIST,
+        placeholder=model,
+        disabled=processing,
+        on_change=State.set_model,
+        style=style.select_style,
+    )
+
+
+@rx.memo
+def controls_row(model: rx.Var[str], processing: rx.Var[bool]) -> rx.Component:
+    """The model select and send/stop button below the input.
+
+    Memoized on its props so typing in the input does not re-render it.
+    """
+    return rx.hstack(
+        model_select(model, processing),
+        rx.spacer(),
+        rx.cond(
+            processing,
+            rx.button(
+                _STOP_ICON,
+                on_click=State.stop_process,
+                style=_ICON_BUTTON_STYLE,
+            ),
+            rx.button(
+                _SEND_ICON,
+                on_click=State.process_question,
+                style=_ICON_BUTTON_STYLE,
+            ),
+        ),
+        style=style.controls_style,
+    )
+
 
 def action_bar() -> rx.Component:
     """The action bar component for user input."""
@@ -11,61 +66,25 @@ def action_bar() -> rx.Component:
         State.editing_index != None,
         rx.fragment(),
         rx.box(
-            rx.vstack(
-                rx.form(
-                    rx.vstack(
-                        rx.text_area(
-                            value=State.question,
-                            placeholder="何でも質問してください...",
-                            on_change=State.set_question,
-                            style=style.input_style,
-                            on_key_down=State.handle_keydown,
-                        ),
-                        rx.hstack(
-                            rx.hstack(
-                                rx.select(
-                                    [
-                                        "deepseek/deepseek-r1",
-                                        "aion-labs/aion-1.0",
-                                        "openai/gpt-4o-mini",
-                                        "google/gemini-2.0-flash-thinking-exp:free",
-                                    ],
-                                    placeholder=State.model,
-                                    disabled=State.processing,
-                                    on_change=State.set_model,
-                                    style=style.select_style,
-                                ),
-                            ),
-                            rx.spacer(),
-                            rx.cond(
-                                State.processing,
-                                rx.button(
-                                    rx.icon("circle-stop", color="crimson"),
-                                    on_click=State.stop_process,
-                                    style=dict(
-                                        background_color="transparent",
-                                        border="0px solid #E9E9E9",
-                                        color="black",
-                                    ),
-                                ),
-                                rx.button(
-                                    rx.icon("arrow-right"),
-                                    on_click=State.process_question,
-                                    style=dict(
-                                        background_color="transparent",
-                                        border="0px solid #E9E9E9",
-                                        color="black",
-                                    ),
-                                ),
-                            ),
-                            style=style.controls_style,
-                        ),
+            rx.form(
+                # Keep keystrokes local and only sync the question
+                # to the backend once typing pauses.
+                rx.debounce_input(
+                    rx.text_area(
+                        id="input-textarea",
+                        value=State.question,
+                        placeholder="何でも質問してください...",
+                        on_change=State.set_question,
+                        style=style.input_style,
+                        on_key_down=State.handle_keydown,
                     ),
-                    on_submit=State.process_question,
-                    style=style.form_style,
+                    debounce_timeout=INPUT_DEBOUNCE_TIMEOUT,
                 ),
-                width="100%",
+                controls_row(model=State.model, processing=State.processing),
+                on_submit=State.process_question,
+                style=style.form_style,
             ),
+            rx.script(src="/autoresize.js", strategy="afterInteractive"),
             style=style.input_container_style,
             position="sticky",
             bottom="0",
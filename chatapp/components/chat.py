@@ -3,50 +3,62 @@
 import reflex as rx
 from chatapp.state import State
 from chatapp import style
+from chatapp.components.action_bar import INPUT_DEBOUNCE_TIMEOUT, model_select
 
-chat_style = dict(
-    padding="2em",
-    height="100vh",
-    overflow_y="auto",
-    background_color="white",
-    color="black",
-    scroll_behavior="smooth",
-)
+
+@rx.memo
+def question_message(question: rx.Var[str]) -> rx.Component:
+    """Display a question as markdown.
+
+    Memoized on the question text, so it is not re-rendered while its
+    answer streams in.
+    """
+    return rx.box(
+        rx.markdown(question, style=style.question_style),
+        style=style.question_container_style,
+    )
+
+
+@rx.memo
+def answer_message(answer: rx.Var[str]) -> rx.Component:
+    """Display an answer as markdown.
+
+    Memoized on the answer text, so it is only re-rendered when the answer
+    itself changes.
+    """
+    return rx.box(
+        rx.markdown(answer, style=style.answer_style),
+        width="100%",
+    )
+
+
+def message_pair(question: str, answer: str) -> rx.Component:
+    """Display a question and answer pair."""
+    return rx.box(
+        question_message(question=question),
+        answer_message(answer=answer),
+        style=style.message_pair_style,
+    )
 
 
 def message_with_context_menu(question: str, answer: str, index: int) -> rx.Component:
     """Display a message pair with a context menu for editing and deleting."""
     return rx.context_menu.root(
         rx.context_menu.trigger(
-            rx.box(
-                # Question container
-                rx.box(
-                    rx.box(
-                        rx.markdown(question, style=style.question_style),
-                        width="100%",  # Inner box takes full width of the 80% container
-                    ),
-                    width="80%",  # Outer box is 80% of the full width
-                    margin_left="20%",  # Push to the right
-                ),
-                # Answer container
-                rx.box(
-                    rx.markdown(answer, style=style.answer_style),
-                    width="100%",
-                ),
-                margin_y="1em",
-                width="100%",  # Full width container for both Q&A
-            ),
+            message_pair(question=question, answer=answer),
         ),
         rx.context_menu.content(
             rx.context_menu.item(
                 "Edit Question",
                 on_click=lambda: State.start_editing(index),
+                disabled=State.processing,
             ),
             rx.context_menu.separator(),
             rx.context_menu.item(
                 "Delete Message",
                 color_scheme="red",
                 on_click=lambda: State.delete_message(index),
+                disabled=State.processing,
             ),
             style=style.context_menu_style,
         ),
@@ -55,68 +67,101 @@ def message_with_context_menu(question: str, answer: str, index: int) -> rx.Comp
 
 def editing_question_input(index: int) -> rx.Component:
     """Display the editing interface for a question."""
-    return rx.box(
-        rx.vstack(
-            rx.form(
-                rx.vstack(
-                    rx.text_area(
-                        value=State.question,
-                        placeholder="Edit your question...",
-                        on_change=State.set_question,
-                        style=style.input_style,
-                    ),
-                    rx.hstack(
-                        rx.select(
-                            [
-                                "deepseek/deepseek-r1",
-                                "aion-labs/aion-1.0",
-                                "openai/gpt-4o-mini",
-                                "google/gemini-2.0-flash-thinking-exp:free",
-                            ],
-                            placeholder=State.model,
-                            disabled=State.processing,
-                            on_change=State.set_model,
-                            style=style.select_style,
-                        ),
-                        rx.spacer(),
-                        rx.button(
-                            "Cancel",
-                            on_click=State.cancel_editing,
-                            style=style.button_style,
-                        ),
-                        rx.button(
-                            "Update",
-                            type="submit",
-                            style=style.button_style,
-                        ),
-                        justify="end",
-                        width="100%",
-                    ),
-                ),
-                on_submit=State.update_question,
+    return rx.form(
+        rx.debounce_input(
+            rx.text_area(
+                value=State.question,
+                placeholder="Edit your question...",
+                on_change=State.set_question,
+                style=style.input_style,
+            ),
+            debounce_timeout=INPUT_DEBOUNCE_TIMEOUT,
+        ),
+        rx.hstack(
+            model_select(State.model, State.processing),
+            rx.spacer(),
+            rx.button(
+                "Cancel",
+                on_click=State.cancel_editing,
+                style=style.button_style,
+            ),
+            rx.button(
+                "Update",
+                type="submit",
+                style=style.button_style,
             ),
+            justify="end",
             width="100%",
         ),
-        style=style.input_container_style,
+        on_submit=State.update_question,
+        style=style.editor_form_style,
     )
 
 
-def qa(question: str, answer: str, index: int) -> rx.Component:
-    """Display a question and answer pair."""
+def collapsible_message(
+    question: str, answer: str, preview: str, index: int
+) -> rx.Component:
+    """Display a message pair, collapsing long answers to a preview."""
     return rx.cond(
-        State.editing_index == index,
-        editing_question_input(index),
+        (preview != "") & (State.expanded_index != index),
+        rx.box(
+            message_with_context_menu(question, preview, index),
+            rx.button(
+                "すべて表示",
+                on_click=lambda: State.expand_answer(index),
+                style=style.button_style,
+            ),
+            width="100%",
+        ),
         message_with_context_menu(question, answer, index),
     )
 
 
+def qa(question: str, answer: str, preview: str, index: int) -> rx.Component:
+    """Display a question and answer pair."""
+    # Only the active pair (edited or streamed) needs any further checks
+    return rx.cond(
+        State.active_index == index,
+        rx.cond(
+            State.is_editing,
+            editing_question_input(index),
+            message_with_context_menu(question, State.streaming_answer, index),
+        ),
+        collapsible_message(question, answer, preview, index),
+    )
+
+
+def visible_row(answer: str, index: int) -> rx.Component:
+    """Render a row of the visible window, keyed by its absolute index.
+
+    The default foreach key is the position in the window, which shifts
+    for every row when earlier messages are loaded and remounts them all.
+    """
+    position = index + State.visible_start
+    return rx.fragment(
+        qa(
+            State.visible_questions[index],
+            answer,
+            State.visible_previews[index],
+            position,
+        ),
+        key=position,
+    )
+
+
 def chat() -> rx.Component:
     """The main chat component."""
     return rx.vstack(
-        rx.foreach(
-            State.chat_history,
-            lambda messages, index: qa(messages[0], messages[1], index),
+        rx.cond(
+            State.visible_start > 0,
+            rx.button(
+                "以前のメッセージを読み込む",
+                on_click=State.load_earlier,
+                style=style.button_style,
+                align_self="center",
+            ),
         ),
+        rx.foreach(State.visible_answers, visible_row),
         align="end",
         width="100%",
         padding_bottom="5em",
@@ -2,38 +2,35 @@
 
 import reflex as rx
 from chatapp.state import State
+from chatapp import style
 
-sidebar_style = dict(
-    padding="1em",
-    background_color="#FFFFFF",
-    border_right="1px solid #E9E9E9",
-    height="100vh",
-    width="250px",
-    color="black",
-)
 
-
-def chat_item(chat: str) -> rx.Component:
-    """A chat item in the sidebar."""
+def _chat_button(chat: str, *children: rx.Component) -> rx.Component:
+    """A button in the sidebar that loads a chat."""
     return rx.button(
         rx.hstack(
             rx.text(chat),
             rx.spacer(),
-            rx.cond(
-                chat != "New Chat",
-                rx.icon(
-                    "trash",
-                    on_click=State.delete_chat,
-                    color="red",
-                ),
-            ),
+            *children,
+        ),
+        on_click=State.load_chat(chat),
+        style=style.chat_item_style,
+    )
+
+
+@rx.memo
+def chat_item(chat: rx.Var[str]) -> rx.Component:
+    """A deletable chat item in the sidebar.
+
+    Memoized so that adding a chat only renders the new item.
+    """
+    return _chat_button(
+        chat,
+        rx.icon(
+            "trash",
+            on_click=State.delete_chat,
+            color="red",
         ),
-        on_click=lambda: State.load_chat(chat),
-        width="100%",
-        padding="0.5em",
-        border_radius="8px",
-        _hover={"background_color": "#F5F5F5"},
-        style={"text_align": "left"},
     )
 
 
@@ -49,13 +46,16 @@ def sidebar() -> rx.Component:
             ),
             rx.divider(),
             rx.heading("履歴", size="5"),
+            # "New Chat" is always first and cannot be deleted, so it is
+            # rendered on its own instead of checked for in every item
+            _chat_button("New Chat"),
             rx.foreach(
-                State.history,
-                lambda item: chat_item(item),
+                State.history[1:],
+                lambda item: chat_item(chat=item, key=item),
             ),
             align="start",
             spacing="4",
             height="100%",
         ),
-        style=sidebar_style,
+        style=style.sidebar_style,
     )
@@ -1,23 +1,72 @@
 """State management for the chat app."""
 
+import asyncio
+import contextlib
+import hashlib
+import json
 import os
+import time
+from dataclasses import dataclass
 from typing import *
+
+import aiohttp
 import reflex as rx
 from dotenv import load_dotenv
 
+# orjson serializes the requests and parses the streamed JSON faster when it
+# is installed
+try:
+    from orjson import dumps as json_dumps, loads as json_loads
+except ImportError:
+    from json import dumps as json_dumps, loads as json_loads
+
 load_dotenv()
 
+# Read once at import, after the .env file has been loaded.
+OPENROUTER_API_KEY = os.getenv("OPENROUTER_API_KEY")
+
 ENABLE_AUTO_SCROLL_DOWN = False
 
-import json
-from typing import *
-import aiohttp
-import asyncio
-from asyncio import Queue
-from dataclasses import dataclass
+# Replay the answer to a request identical to an earlier one (same model and
+# messages) instead of calling the API again. Off by default since a model can
+# answer the same prompt differently; useful while working on the UI.
+ENABLE_RESPONSE_CACHE = False
+RESPONSE_CACHE_SIZE = 512
+
+# Models offered in the model selects; the first one is the default.
+MODELS = (
+    "deepseek/deepseek-r1",
+    "aion-labs/aion-1.0",
+    "openai/gpt-4o-mini",
+    "google/gemini-2.0-flash-thinking-exp:free",
+)
+
+# Number of Q&A pairs rendered at once; older pairs are loaded on demand.
+HISTORY_WINDOW_SIZE = 50
 
+# Older Q&A pairs are loaded when the chat is scrolled within this many pixels
+# of its top.
+LOAD_EARLIER_SCROLL_TOP = 200
 
-@dataclass
+# Answers longer than this many characters or lines are collapsed to a
+# preview until expanded.
+ANSWER_PREVIEW_LENGTH = 4096
+ANSWER_PREVIEW_LINES = 40
+
+# Cached answers are replayed in slices of this many characters, this many
+# seconds apart, so that they still stream in instead of appearing at once.
+REPLAY_SLICE_LENGTH = 50
+REPLAY_SLICE_DELAY = 0.01
+
+# Minimum number of seconds between state updates while streaming an answer.
+STREAM_FLUSH_INTERVAL = 0.08
+
+# Maximum number of parsed chunks buffered between reading a stream and
+# consuming it.
+STREAM_QUEUE_SIZE = 256
+
+
+@dataclass(slots=True)
 class StreamChunk:
     content: Optional[str] = None
     reasoning: Optional[str] = None
@@ -28,103 +77,145 @@ class StreamChunk:
 class StreamProcessor:
     """Improved stream processor that handles long responses and reasoning tokens."""
 
-    def __init__(self, response, session):
+    def __init__(self, response, cache_key: Optional[bytes] = None):
         self.response = response
-        self.session = session
-        self.buffer = ""
         self._closed = False
         self._done = False
-        self._complete_messages = []
-        self._current_message = {"content": "", "reasoning": ""}
-        self._lock = asyncio.Lock()
+        # Key under which the chunks of a complete stream are cached, if any
+        self._cache_key = cache_key
+        self._chunks: List[StreamChunk] = []
+        # Chunks read from the response, ended by None
+        self._queue: asyncio.Queue = asyncio.Queue(maxsize=STREAM_QUEUE_SIZE)
+        self._reader: Optional[asyncio.Task] = None
+        # Set once the reader is done, with the error it failed on, if any
+        self._ended = False
+        self._error: Optional[Exception] = None
 
     async def start(self):
-        """Start processing the stream."""
+        """Start reading the stream in the background.
+
+        The socket keeps being drained while the consumer waits on the
+        state lock, instead of only between the consumer's updates.
+        """
+        if self._reader is None:
+            self._reader = asyncio.create_task(self._read())
         return self
 
     async def _process_line(self, line):
-        """Process a single line of SSE data."""
-        if line.startswith("data: "):
-            data = line[6:]
-            if data == "[DONE]":
-                self._done = True
-                return True
+        """Process a single line of SSE data, given as bytes."""
+        if line == b"data: [DONE]":
+            return StreamChunk(is_done=True)
+        # Blank event separators and ": keep-alive" comments carry no data
+        if not line.startswith(b"data: "):
+            return None
 
-            try:
-                data_obj = json.loads(data)
-                chunk = ChatCompletionChunk(data_obj)
-
-                if chunk.choices:
-                    choice = chunk.choices[0]
-                    delta = choice.delta
-
-                    # Store both content and reasoning from this chunk
-                    if delta.content is not None:
-                        self._current_message["content"] += delta.content
-                    if delta.reasoning is not None:
-                        self._current_message["reasoning"] += delta.reasoning
-
-                    # Create a StreamChunk with all available data
-                    return StreamChunk(
-                        content=delta.content, reasoning=delta.reasoning, is_done=False
-                    )
-
-            except json.JSONDecodeError:
-                pass
+        # Events without any text, such as usage or finish reason only ones,
+        # are skipped without being parsed
+        data = line[6:]
+        if b'"content"' not in data and b'"reasoning"' not in data:
+            return None
+
+        try:
+            data_obj = json_loads(data)
+
+            # Read the delta straight from the parsed JSON
+            choices = data_obj.get("choices")
+            if choices:
+                delta = choices[0].get("delta") or {}
+                content = delta.get("content")
+                reasoning = delta.get("reasoning")
+
+                # Create a StreamChunk with all available data
+                return StreamChunk(content, reasoning)
+
+        except json.JSONDecodeError:
+            pass
         return None
 
-    async def _read_chunk(self):
-        """Read a chunk from the response and process it."""
+    async def _read(self):
+        """Read and parse the response into the queue."""
         try:
-            chunk = await self.response.content.read(1024)
-            if not chunk:
-                return None
-            return chunk.decode("utf-8")
+            # The response content yields one line at a time, so aiohttp
+            # does the framing in its own buffer; lines are kept as bytes,
+            # which the JSON parser reads directly
+            async for line in self.response.content:
+                if self._done or self._closed:
+                    break
+
+                result = await self._process_line(line.strip())
+                if result:
+                    if result.is_done:
+                        self._done = True
+                        break
+                    if result.content is not None or result.reasoning is not None:
+                        if self._cache_key is not None:
+                            self._chunks.append(result)
+                        await self._queue.put(result)
+
         except Exception as e:
-            return None
+            # Handed to the consumer, unless the stream was closed on purpose
+            if not self._closed:
+                self._error = e
 
-    async def __aiter__(self):
-        """Iterate over the stream chunks with improved error handling."""
-        while not self._done and not self._closed:
-            try:
-                chunk = await self._read_chunk()
-                if not chunk:
-                    break
+        # Only cache answers that were streamed to the end
+        if self._done and self._cache_key is not None:
+            _cache_response(self._cache_key, self._chunks)
 
-                self.buffer += chunk
+        self._end()
 
-                while True:
-                    line_end = self.buffer.find("\n")
-                    if line_end == -1:
-                        break
+    def _end(self):
+        """Mark the stream as read to the end and wake up the consumer.
 
-                    line = self.buffer[:line_end].strip()
-                    self.buffer = self.buffer[line_end + 1 :]
+        Never blocks: if the queue is full, the consumer sees that the
+        stream has ended once it has drained it.
+        """
+        self._ended = True
+        if not self._queue.full():
+            self._queue.put_nowait(None)
 
-                    result = await self._process_line(line)
-                    if result:
-                        if result.is_done:
-                            self._done = True
-                            break
-                        if result.content is not None or result.reasoning is not None:
-                            yield result
+    def __aiter__(self):
+        """Iterate over the stream chunks with improved error handling."""
+        return self.chunks()
+
+    async def chunks(self, idle_timeout: Optional[float] = None):
+        """Iterate over the stream chunks.
 
-            except Exception as e:
-                # Log error if needed
+        With an idle_timeout, None is yielded whenever no chunk arrives for
+        that many seconds, so the consumer can flush what it already has.
+        """
+        await self.start()
+        while not self._closed:
+            if self._ended and self._queue.empty():
                 break
+            try:
+                result = await asyncio.wait_for(self._queue.get(), idle_timeout)
+            except asyncio.TimeoutError:
+                yield None
+                continue
+            if result is None:
+                break
+            yield result
 
         # Final cleanup
         if not self._closed:
             await self.close()
 
+        # A failed read is raised rather than ending the stream quietly, so
+        # a truncated answer is reported instead of committed as complete
+        if self._error is not None:
+            raise self._error
+
     async def close(self):
         """Close the stream processor and clean up resources."""
         if not self._closed:
             self._closed = True
+            if self._reader is not None:
+                self._reader.cancel()
+                # Wake up a consumer waiting for the next chunk
+                if not self._queue.full():
+                    self._queue.put_nowait(None)
             if self.response:
                 await self.response.release()
-            if self.session:
-                await self.session.close()
 
     async def __aenter__(self):
         await self.start()
@@ -134,33 +225,75 @@ class StreamProcessor:
         await self.close()
 
 
-class ChatCompletionChunk:
-    def __init__(self, chunk_data: Dict[str, Any]):
-        self.choices = [Choice(choice) for choice in chunk_data.get("choices", [])]
-        self.id = chunk_data.get("id")
-        self.model = chunk_data.get("model")
-        self.created = chunk_data.get("created")
-
+class ReplayedStream(StreamProcessor):
+    """Stream processor that replays the chunks of a cached answer."""
 
-class Choice:
-    def __init__(self, choice_data: Dict[str, Any]):
-        self.delta = Delta(choice_data.get("delta", {}))
-        self.index = choice_data.get("index")
-        self.finish_reason = choice_data.get("finish_reason")
+    def __init__(self, chunks: List[StreamChunk]):
+        super().__init__(None)
+        self._replay = chunks
 
+    def _slices(self):
+        """Yield the cached text re-cut into slices of REPLAY_SLICE_LENGTH."""
+        runs: List[List[str]] = []  # [field, text] of consecutive chunks
+        for chunk in self._replay:
+            for field in ("reasoning", "content"):
+                text = getattr(chunk, field)
+                if not text:
+                    continue
+                if runs and runs[-1][0] == field:
+                    runs[-1][1] += text
+                else:
+                    runs.append([field, text])
+        for field, text in runs:
+            for start in range(0, len(text), REPLAY_SLICE_LENGTH):
+                yield StreamChunk(**{field: text[start : start + REPLAY_SLICE_LENGTH]})
 
-class Delta:
-    def __init__(self, delta_data: Dict[str, Any]):
-        self.content = delta_data.get("content")
-        self.role = delta_data.get("role")
-        self.reasoning = delta_data.get("reasoning")
+    async def _read(self):
+        """Put the cached answer into the queue, paced like a live stream."""
+        for chunk in self._slices():
+            await self._queue.put(chunk)
+            await asyncio.sleep(REPLAY_SLICE_DELAY)
+        self._end()
 
 
 class AsyncOpenRouterAI:
     def __init__(self, api_key: str, base_url: str = "https://openrouter.ai/api/v1"):
         self.api_key = api_key
         self.base_url = base_url.rstrip("/")
+        self.completions_url = f"{self.base_url}/chat/completions"
+        self.headers = {
+            "Authorization": f"Bearer {api_key}",
+            "Content-Type": "application/json",
+        }
         self.chat = self.Chat(self)
+        self._session: Optional[aiohttp.ClientSession] = None
+
+    def _get_session(self) -> aiohttp.ClientSession:
+        """Return the HTTP session shared by all requests, so that
+        connections to the API are kept alive and reused."""
+        if self._session is None or self._session.closed:
+            self._session = aiohttp.ClientSession(
+                # Every request goes to the same host, so allow many
+                # concurrent streams to it and keep idle connections and
+                # the DNS answer around between questions
+                connector=aiohttp.TCPConnector(
+                    limit=100,
+                    limit_per_host=32,
+                    ttl_dns_cache=600,
+                    keepalive_timeout=75,
+                ),
+                # Answers can stream for minutes, so only bound connecting
+                timeout=aiohttp.ClientTimeout(total=None, sock_connect=30),
+                # A large read buffer so that long SSE lines are not rejected
+                read_bufsize=2**20,
+            )
+        return self._session
+
+    async def close(self):
+        """Close the shared HTTP session."""
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
 
     class Chat:
         def __init__(self, client):
@@ -174,14 +307,8 @@ class AsyncOpenRouterAI:
             stream: bool = False,
             include_reasoning: bool = False,
             **kwargs,
-        ) -> Union[ChatCompletionChunk, StreamProcessor]:
+        ) -> Union[Dict[str, Any], StreamProcessor]:
             """Create a chat completion with queue-based streaming."""
-            url = f"{self.client.base_url}/chat/completions"
-            headers = {
-                "Authorization": f"Bearer {self.client.api_key}",
-                "Content-Type": "application/json",
-            }
-
             payload = {
                 "model": model,
                 "messages": messages,
@@ -190,81 +317,267 @@ class AsyncOpenRouterAI:
                 **kwargs,
             }
 
-            session = aiohttp.ClientSession()
-            try:
-                response = await session.post(url, headers=headers, json=payload)
+            body = json_dumps(payload)
+
+            cache_key = None
+            if stream and ENABLE_RESPONSE_CACHE:
+                cache_key = _response_cache_key(body)
+                chunks = _response_cache.pop(cache_key, None)
+                if chunks is not None:
+                    # Re-insert to mark it as the most recently used
+                    _response_cache[cache_key] = chunks
+                    return await ReplayedStream(chunks).start()
+
+            session = self.client._get_session()
+            response = await session.post(
+                self.client.completions_url,
+                headers=self.client.headers,
+                data=body,
+            )
+
+            # The response is released here unless a StreamProcessor takes
+            # it over; the shared session is never closed by a request
+            if not stream or not response.ok:
+                try:
+                    response.raise_for_status()
+                    return await response.json(loads=json_loads)
+                finally:
+                    await response.release()
 
-                if not stream:
-                    try:
-                        data = await response.json()
-                        return ChatCompletionChunk(data)
-                    finally:
-                        await session.close()
+            return await StreamProcessor(response, cache_key).start()
 
-                return await StreamProcessor(response, session).start()
 
-            except Exception as e:
-                await session.close()
-                raise
+# Chunks of complete streamed answers, keyed by a hash of the request body and
+# ordered from least to most recently used. Only filled when
+# ENABLE_RESPONSE_CACHE is set.
+_response_cache: Dict[bytes, List[StreamChunk]] = {}
 
 
-class QA(rx.Base):
-    """A question and answer pair."""
+def _response_cache_key(body: Union[str, bytes]) -> bytes:
+    """Hash a request body into a response cache key."""
+    if isinstance(body, str):
+        body = body.encode()
+    return hashlib.blake2b(body, digest_size=16).digest()
 
-    question: str
-    answer: str
+
+def _cache_response(key: bytes, chunks: List[StreamChunk]):
+    """Cache the chunks of an answer, evicting the least recently used."""
+    _response_cache.pop(key, None)
+    _response_cache[key] = chunks
+    while len(_response_cache) > RESPONSE_CACHE_SIZE:
+        del _response_cache[next(iter(_response_cache))]
+
+
+# The API client shared by every session. Constructing it does no I/O; its
+# HTTP session is only opened by the first request.
+_client = AsyncOpenRouterAI(
+    base_url="https://openrouter.ai/api/v1",
+    api_key=OPENROUTER_API_KEY,
+)
+
+
+@contextlib.asynccontextmanager
+async def close_client_on_shutdown():
+    """Lifespan task that closes the shared API client with the app."""
+    yield
+    await _client.close()
+
+
+def _answer_preview(answer: str) -> str:
+    """Return the collapsed preview of an answer, or "" if it is short enough.
+
+    The preview ends on a line boundary, and a code block left open by the
+    cut is closed so the rest of the preview does not render as code.
+    """
+    lines = answer.split("\n", ANSWER_PREVIEW_LINES)
+    if len(lines) <= ANSWER_PREVIEW_LINES and len(answer) <= ANSWER_PREVIEW_LENGTH:
+        return ""
+    preview = "\n".join(lines[:ANSWER_PREVIEW_LINES])
+    if len(preview) > ANSWER_PREVIEW_LENGTH:
+        cut = preview.rfind("\n", 0, ANSWER_PREVIEW_LENGTH)
+        preview = preview[: cut if cut > 0 else ANSWER_PREVIEW_LENGTH]
+    fences = sum(1 for line in preview.split("\n") if line.lstrip().startswith("```"))
+    if fences % 2:
+        preview += "\n```"
+    return preview + "\n\n…"
+
+
+# Streams of the answers being generated, keyed by client token, so that
+# stop_process can close the connection of a running stream.
+_active_streams: Dict[str, StreamProcessor] = {}
 
 
 class State(rx.State):
     """The app state."""
 
-    # Chat state
-    chat_history: List[Tuple[str, str]] = []
+    # Chat state, stored as parallel lists so that updating an answer does
+    # not touch the questions
+    questions: List[str] = []
+    answers: List[str] = []
     question: str = ""
-    model: str = "deepseek/deepseek-r1"
+    model: str = MODELS[0]
     previous_keydown_character: str = ""
 
     # UI state
     processing: bool = False
-    modal_open: bool = False
+    # The answer being streamed and the index of the pair it belongs to; the
+    # answer is committed to the chat history once the stream ends so that each
+    # update only sends this string instead of the whole history.
+    streaming_answer: str = ""
+    streaming_index: int = -1
+    window_size: int = HISTORY_WINDOW_SIZE
+    # Index of the long answer shown in full, or -1
+    expanded_index: int = -1
 
     # Editing
-    editing_question: Optional[str] = None
     editing_index: Optional[int] = None
 
     # Conversation management
-    chats: Dict[str, List[Tuple[str, str]]] = {"New Chat": []}
+    # Backend-only archive of every chat; never serialized to the client
+    _chats: Dict[str, List[Tuple[str, str]]] = {"New Chat": []}
+    # The current chat as API messages, kept in step with the questions and
+    # answers so a turn does not rebuild them
+    _api_messages: List[Dict[str, str]] = []
     current_chat: str = "New Chat"
     history: List[str] = ["New Chat"]
 
     def create_new_chat(self):
         """Create a new chat session."""
-        new_chat_id = f"Chat {len(self.chats) + 1}"
-        self.chats[new_chat_id] = []
+        self._save_current_chat()
+        new_chat_id = f"Chat {len(self._chats) + 1}"
+        self._chats[new_chat_id] = []
         self.history.append(new_chat_id)
         self.current_chat = new_chat_id
-        self.chat_history = self.chats[self.current_chat]
-        self.processing = False
+        self._load_current_chat()
+        self.window_size = HISTORY_WINDOW_SIZE
+        self.expanded_index = -1
 
     def load_chat(self, chat_id: str):
         """Load a specific chat history."""
-        if chat_id in self.chats:
+        if chat_id in self._chats:
+            self._save_current_chat()
             self.current_chat = chat_id
-            self.chat_history = self.chats[chat_id]
+            self._load_current_chat()
+            self.window_size = HISTORY_WINDOW_SIZE
+            self.expanded_index = -1
 
     def delete_chat(self):
         """Delete the current chat."""
         if self.current_chat != "New Chat":
-            del self.chats[self.current_chat]
+            del self._chats[self.current_chat]
             self.history.remove(self.current_chat)
             # Set current chat to "New Chat" or the last chat in history
             self.current_chat = "New Chat"
-            self.chat_history = self.chats[self.current_chat]
+            self._load_current_chat()
+            self.window_size = HISTORY_WINDOW_SIZE
+            self.expanded_index = -1
+
+    @rx.var(cache=True)
+    def visible_start(self) -> int:
+        """Index in chat history of the first rendered Q&A pair."""
+        return max(len(self.questions) - self.window_size, 0)
+
+    @rx.var(cache=True)
+    def visible_questions(self) -> List[str]:
+        """The questions of the most recent Q&A pairs that are rendered."""
+        return self.questions[-self.window_size :]
+
+    @rx.var(cache=True)
+    def visible_answers(self) -> List[str]:
+        """The answers of the most recent Q&A pairs that are rendered."""
+        return self.answers[-self.window_size :]
+
+    @rx.var(cache=True)
+    def visible_previews(self) -> List[str]:
+        """Collapsed previews of the rendered answers, "" for short ones."""
+        return [_answer_preview(answer) for answer in self.visible_answers]
+
+    @rx.var(cache=True)
+    def has_history(self) -> bool:
+        """Whether the current chat has any Q&A pairs."""
+        return bool(self.questions)
+
+    @rx.var(cache=True)
+    def active_index(self) -> int:
+        """Index of the Q&A pair being edited or streamed, or -1."""
+        if self.editing_index is not None:
+            return self.editing_index
+        return self.streaming_index
+
+    @rx.var(cache=True)
+    def is_editing(self) -> bool:
+        """Whether the pair at active_index is being edited."""
+        return self.editing_index is not None
+
+    def load_earlier(self):
+        """Render older Q&A pairs once the chat is scrolled near its top."""
+        if self.visible_start > 0:
+            self.window_size += HISTORY_WINDOW_SIZE
+
+    def _load_current_chat(self):
+        """Load the current chat from the chats dictionary."""
+        pairs = self._chats[self.current_chat]
+        self.questions = [q for q, _ in pairs]
+        self.answers = [a for _, a in pairs]
+
+        messages = []
+        for q, a in pairs:
+            messages.append({"role": "user", "content": q})
+            messages.append({"role": "assistant", "content": a})
+        self._api_messages = messages
+
+        # A running stream only shows its answer while its chat is open
+        self.streaming_index = -1
+        self.streaming_answer = ""
+
+    def _append_pair(self, question: str, answer: str):
+        """Add a Q&A pair to the current chat."""
+        self.questions.append(question)
+        self.answers.append(answer)
+        self._api_messages.append({"role": "user", "content": question})
+        self._api_messages.append({"role": "assistant", "content": answer})
+
+    def _set_question(self, index: int, question: str):
+        """Replace the question of a Q&A pair."""
+        self.questions[index] = question
+        self._api_messages[2 * index] = {"role": "user", "content": question}
+
+    def _set_answer(self, index: int, answer: str):
+        """Replace the answer of a Q&A pair."""
+        self.answers[index] = answer
+        self._api_messages[2 * index + 1] = {"role": "assistant", "content": answer}
+
+    def _add_pair_to(self, chat: str, question: str, answer: str) -> int:
+        """Add a Q&A pair to a chat, open or not, and return its index."""
+        if chat == self.current_chat:
+            self._append_pair(question, answer)
+            return len(self.questions) - 1
+        if chat in self._chats:
+            self._chats[chat].append((question, answer))
+            return len(self._chats[chat]) - 1
+        return -1
+
+    def _set_answer_in(self, chat: str, index: int, answer: str):
+        """Replace the answer of a Q&A pair of a chat, open or not.
+
+        Does nothing if the chat or the pair no longer exists.
+        """
+        if chat == self.current_chat:
+            if 0 <= index < len(self.answers):
+                self._set_answer(index, answer)
+        elif chat in self._chats:
+            pairs = self._chats[chat]
+            if 0 <= index < len(pairs):
+                pairs[index] = (pairs[index][0], answer)
 
     def _save_current_chat(self):
-        """Save current chat history to chats dictionary."""
-        if self.current_chat in self.chats:
-            self.chats[self.current_chat] = self.chat_history
+        """Save current chat history to chats dictionary.
+
+        Only called when switching chats; the questions and answers lists
+        are the source of truth for the current chat until then.
+        """
+        if self.current_chat in self._chats:
+            self._chats[self.current_chat] = list(zip(self.questions, self.answers))
 
     @rx.event
     def handle_keydown(self, keydown_character: str):
@@ -282,95 +595,122 @@ class State(rx.State):
         async with self:
             self.processing = False
 
-    def format_messages(self, question: str) -> List[Dict[str, str]]:
-        """Format chat history and current question into messages for the API."""
-        messages = []
-
-        # Add chat history
-        for q, a in self.chat_history:
-            messages.append({"role": "user", "content": q})
-            messages.append({"role": "assistant", "content": a})
-
-        # Add the current question
-        messages.append({"role": "user", "content": question})
-
-        return messages
+        # Close the connection so the stream ends without waiting for the
+        # next chunk and the provider stops generating.
+        processor = _active_streams.pop(self.router.session.client_token, None)
+        if processor is not None:
+            await processor.close()
 
+    # The streaming handlers must stay background events: the state lock is
+    # then only held for the short flushes instead of the whole stream, and
+    # other events of the session keep running while an answer streams.
     @rx.event(background=True)
     async def process_question(self):
         """Process the current question and add the Q&A pair to chat history."""
-        if not self.question.strip():
+        # Ctrl+Enter still reaches here while an answer streams
+        if self.processing or not self.question.strip():
             return
 
-        # Store the current question but don't clear it yet
+        # Store the current question but don't clear it yet, and remember
+        # the chat it belongs to in case another one is opened meanwhile
         current_question = self.question
+        chat = self.current_chat
+        index = -1
+        answer = None
+        processor = None
 
         try:
-            # Initialize API client
-            client = AsyncOpenRouterAI(
-                base_url="https://openrouter.ai/api/v1",
-                api_key=os.getenv("OPENROUTER_API_KEY"),
-            )
-
-            # Format messages for the API
-            messages = self.format_messages(current_question)
-
             # Start the stream processor
-            processor = await client.chat.completions.create(
+            processor = await _client.chat.completions.create(
                 model=self.model,
-                messages=messages,
+                messages=[
+                    *self._api_messages,
+                    {"role": "user", "content": current_question},
+                ],
                 stream=True,
                 include_reasoning=True,
             )
+            _active_streams[self.router.session.client_token] = processor
 
-            # Now that we have a processor, we can safely update the state
-            async with self:
-                self.processing = True
-                self.question = ""  # Clear the input
-                self.chat_history.append((current_question, ""))  # Add new Q&A pair
-                self._save_current_chat()
-
-            yield  # Allow UI to update
-
-            # Process the stream
+            # Enter the processor right away so the connection is closed
+            # however the handler exits from here on
             async with processor:
+                # Now that we have a processor, we can safely update the state
+                async with self:
+                    self.processing = True
+                    self.question = ""  # Clear the input
+                    # Add new Q&A pair
+                    index = self._add_pair_to(chat, current_question, "")
+                    if chat == self.current_chat:
+                        self.streaming_index = index
+
+                yield  # Allow UI to update
+
+                # Process the stream, collecting the pieces and only joining
+                # them when flushing instead of copying the answer every chunk
                 answer = ""
-                async for chunk in processor:
-                    if not self.processing:
-                        break
-
-                    async with self:
+                parts = []
+                flushed_parts = 0
+                last_flush = time.monotonic()
+                # None is yielded once the stream goes quiet for an interval,
+                # so text received just before a pause is still flushed
+                async for chunk in processor.chunks(STREAM_FLUSH_INTERVAL):
+                    if chunk is not None:
                         if chunk.reasoning:
-                            answer += chunk.reasoning
-                            self.chat_history[-1] = (current_question, answer)
-                            self._save_current_chat()
+                            parts.append(chunk.reasoning)
                         if chunk.content:
-                            answer += chunk.content
-                            self.chat_history[-1] = (current_question, answer)
-                            self._save_current_chat()
+                            parts.append(chunk.content)
+
+                    # Batch chunks so the client gets one delta per interval,
+                    # and only when the answer has grown since the last one
+                    now = time.monotonic()
+                    if (
+                        now - last_flush < STREAM_FLUSH_INTERVAL
+                        or len(parts) == flushed_parts
+                    ):
+                        continue
+                    last_flush = now
+                    flushed_parts = len(parts)
+                    answer = "".join(parts)
+
+                    async with self:
+                        if not self.processing:
+                            break
+                        if self.current_chat == chat:
+                            if self.streaming_index != index:
+                                self.streaming_index = index
+                            self.streaming_answer = answer
 
                     if ENABLE_AUTO_SCROLL_DOWN:
                         yield rx.call_script(self.scroll_to_bottom_js)
 
+                answer = "".join(parts)
+
         except Exception as e:
             # Handle any errors that occur
+            answer = None
             async with self:
-                if (
-                    len(self.chat_history) > 0
-                    and self.chat_history[-1][0] == current_question
-                ):
-                    self.chat_history[-1] = (current_question, f"Error: {str(e)}")
+                if index != -1:
+                    self._set_answer_in(chat, index, f"Error: {str(e)}")
                 else:
-                    self.chat_history.append((current_question, f"Error: {str(e)}"))
-                self._save_current_chat()
+                    self._add_pair_to(chat, current_question, f"Error: {str(e)}")
 
             if ENABLE_AUTO_SCROLL_DOWN:
                 yield rx.call_script(self.scroll_to_bottom_js)
 
         finally:
-            # Always clean up
+            # Always clean up, committing the complete answer to the chat
+            # history in the same update
+            # Leave the slot alone if a newer stream of the session took it
+            token = self.router.session.client_token
+            if processor is not None and _active_streams.get(token) is processor:
+                del _active_streams[token]
             async with self:
                 self.processing = False
+                self.streaming_index = -1
+                self.streaming_answer = ""
+                if answer is not None:
+                    self._set_answer_in(chat, index, answer)
             yield
 
     @rx.event(background=True)
@@ -385,102 +725,115 @@ class State(rx.State):
 
             new_question = self.question
             current_index = self.editing_index
+            chat = self.current_chat
 
             # Reset editing state
             self.editing_index = None
-            self.editing_question = None
             self.question = ""
 
             # Update the chat history
-            self.chat_history[current_index] = (new_question, "")
-            self._save_current_chat()
+            self._set_question(current_index, new_question)
+            self._set_answer(current_index, "")
+            self.streaming_index = current_index
+            messages = self._api_messages[: 2 * current_index + 1]
 
         yield
 
+        answer = None
+        processor = None
         try:
-            client = AsyncOpenRouterAI(
-                base_url="https://openrouter.ai/api/v1",
-                api_key=os.getenv("OPENROUTER_API_KEY"),
-            )
-
-            messages = self.format_messages(new_question)
-
-            processor = await client.chat.completions.create(
+            processor = await _client.chat.completions.create(
                 model=self.model,
-                messages=messages[: 2 * current_index + 1],
+                messages=messages,
                 stream=True,
                 include_reasoning=True,
             )
+            _active_streams[self.router.session.client_token] = processor
 
             async with processor:
+                # Collect the pieces and only join them when flushing, instead
+                # of copying the whole answer for every chunk
                 answer = ""
-                async for chunk in processor:
-                    if not self.processing:
-                        break
-
-                    async with self:
-                        # Handle both content and reasoning
+                parts = []
+                flushed_parts = 0
+                last_flush = time.monotonic()
+                async for chunk in processor.chunks(STREAM_FLUSH_INTERVAL):
+                    # Handle both content and reasoning
+                    if chunk is not None:
                         if chunk.reasoning:
-                            answer += chunk.reasoning
-                            self.chat_history[current_index] = (new_question, answer)
-                            self._save_current_chat()
+                            parts.append(chunk.reasoning)
                         if chunk.content:
-                            answer += chunk.content
-                            self.chat_history[current_index] = (new_question, answer)
-                            self._save_current_chat()
+                            parts.append(chunk.content)
+
+                    now = time.monotonic()
+                    if (
+                        now - last_flush < STREAM_FLUSH_INTERVAL
+                        or len(parts) == flushed_parts
+                    ):
+                        continue
+                    last_flush = now
+                    flushed_parts = len(parts)
+                    answer = "".join(parts)
+
+                    async with self:
+                        if not self.processing:
+                            break
+                        if self.current_chat == chat:
+                            if self.streaming_index != current_index:
+                                self.streaming_index = current_index
+                            self.streaming_answer = answer
 
                     if ENABLE_AUTO_SCROLL_DOWN:
                         yield rx.call_script(self.scroll_to_bottom_js)
 
+                answer = "".join(parts)
+
         except Exception as e:
+            answer = None
             async with self:
-                self.chat_history[current_index] = (new_question, f"Error: {str(e)}")
-                self._save_current_chat()
+                self._set_answer_in(chat, current_index, f"Error: {str(e)}")
             if ENABLE_AUTO_SCROLL_DOWN:
                 yield rx.call_script(self.scroll_to_bottom_js)
         finally:
+            # Leave the slot alone if a newer stream of the session took it
+            token = self.router.session.client_token
+            if processor is not None and _active_streams.get(token) is processor:
+                del _active_streams[token]
             async with self:
                 self.processing = False
+                self.streaming_index = -1
+                self.streaming_answer = ""
+                if answer is not None:
+                    self._set_answer_in(chat, current_index, answer)
             yield
 
-    scroll_to_bottom_js = """
-const chatContainer = document.getElementById('chat-container');
-if (chatContainer) {
-    // Get the current scroll position and container dimensions
-    const currentScroll = chatContainer.scrollTop;
-    const scrollHeight = chatContainer.scrollHeight;
-    const clientHeight = chatContainer.clientHeight;
-
-    // Calculate the maximum scroll position
-    const maxScroll = scrollHeight - clientHeight;
-
-    // Scroll to bottom and log any issues
-    try {
-        chatContainer.scrollTop = maxScroll;
-        console.log('Scrolled to bottom:', maxScroll);
-    } catch (error) {
-        console.error('Error scrolling:', error);
-    }
-} else {
-    console.warn('Chat container not found');
-};
-"""
+    # Defined in assets/scroll.js
+    scroll_to_bottom_js = "window.__scrollChat && window.__scrollChat()"
 
     def start_editing(self, index: int):
         """Start editing a specific question."""
+        # A running stream holds on to the index of its pair
+        if self.processing:
+            return
         self.editing_index = index
-        self.editing_question = self.chat_history[index][0]
-        self.question = self.chat_history[index][0]
+        self.question = self.questions[index]
 
     def cancel_editing(self):
         """Cancel editing mode."""
         self.editing_index = None
-        self.editing_question = None
         self.question = ""
 
+    def expand_answer(self, index: int):
+        """Show the full text of a collapsed answer."""
+        self.expanded_index = index
+
     def delete_message(self, index: int):
         """Delete a specific message from chat history."""
+        # A running stream holds on to the index of its pair
+        if self.processing:
+            return
         # Remove the message at the specified index
-        self.chat_history.pop(index)
-        # Save the updated chat history
-        self._save_current_chat()
+        self.questions.pop(index)
+        self.answers.pop(index)
+        del self._api_messages[2 * index : 2 * index + 2]
+        self.expanded_index = -1
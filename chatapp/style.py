@@ -1,110 +1,204 @@
 """Styles for the chat app."""
 
+from types import MappingProxyType
+
+# Styles are frozen so that every component shares the same instance and
+# none can mutate it for the others.
+
 # Common styles
 shadow = "rgba(0, 0, 0, 0.15) 0px 2px 8px"
-message_style = dict(
-    padding_inline="1em",
-    margin_block="0.25em",
-    border_radius="1rem",
-    display="inline-block",
-    color="black",
+message_style = MappingProxyType(
+    dict(
+        padding_inline="1em",
+        margin_block="0.25em",
+        border_radius="1rem",
+        display="inline-block",
+        color="black",
+    )
+)
+
+question_style = MappingProxyType(
+    message_style
+    | dict(
+        width="100%",
+        border="1px solid #E9E9E9",
+        box_shadow="none",
+    )
+)
+
+answer_style = MappingProxyType(
+    message_style
+    | dict(
+        background_color="#F9F9F9",
+        border="1px solid #E9E9E9",
+        box_shadow="none",
+        width="100%",
+    )
+)
+
+# Full width container for both Q&A. The browser skips layout and paint of
+# pairs outside the viewport, reserving an estimated height until a pair has
+# been rendered once.
+message_pair_style = MappingProxyType(
+    dict(
+        margin_y="1em",
+        width="100%",
+        content_visibility="auto",
+        contain_intrinsic_block_size="auto 120px",
+    )
+)
+
+# Questions take 80% of the width, pushed to the right
+question_container_style = MappingProxyType(
+    dict(
+        width="80%",
+        margin_left="20%",
+    )
+)
+
+# Layout styles
+chat_style = MappingProxyType(
+    dict(
+        padding="2em",
+        height="100vh",
+        overflow_y="auto",
+        background_color="white",
+        color="black",
+        scroll_behavior="smooth",
+    )
+)
+
+sidebar_style = MappingProxyType(
+    dict(
+        padding="1em",
+        background_color="#FFFFFF",
+        border_right="1px solid #E9E9E9",
+        height="100vh",
+        width="250px",
+        color="black",
+    )
 )
 
-question_style = message_style | dict(
-    width="100%",
-    border="1px solid #E9E9E9",
-    box_shadow="none",
+chat_item_style = MappingProxyType(
+    dict(
+        width="100%",
+        padding="0.5em",
+        border_radius="8px",
+        text_align="left",
+        _hover={"background_color": "#F5F5F5"},
+    )
 )
 
-answer_style = message_style | dict(
-    background_color="#F9F9F9",
-    border="1px solid #E9E9E9",
-    box_shadow="none",
-    width="100%",
+greeting_style = MappingProxyType(
+    dict(
+        color="black",
+        text_align="center",
+        margin_top="20%",
+        margin_bottom="5%",
+    )
 )
 
 # Container styles
-input_container_style = dict(
-    border="1px solid #E9E9E9",
-    border_radius="15px",
-    padding="1em",
-    width="100%",
-    background_color="white",
-    box_shadow=shadow,
-)
-
-form_style = dict(
-    width="100%",
-    border="none",
-    outline="none",
-    box_shadow="none",
-    _focus={"border": "none", "outline": "none", "box_shadow": "none"},
-)
-
-input_style = dict(
-    border="none",
-    padding="0.5em",
-    width="100%",
-    color="black",
-    background_color="transparent",
-    outline="none",
-    box_shadow="none",
-    font_size="1em",
-    min_height="6em",
-    overflow_y="hidden",
-    _focus={"border": "none", "outline": "none", "box_shadow": "none"},
-    _placeholder={"color": "#A3A3A3"},
-)
-
-controls_style = dict(
-    padding_top="0.5em",
-    gap="2",
-    width="100%",
-)
-
-select_style = dict(
-    border="1px solid #E9E9E9",
-    padding="0.5em",
-    border_radius="1em",
-    background_color="#F5F5F5",
-    color="black",
-    width="auto",
-    min_width="150px",
-)
-
-button_style = dict(
-    background_color="#FFFFFF",
-    border="1px solid #E9E9E9",
-    border_radius="50%",
-    padding="0.5em",
-    aspect_ratio="1",
-    color="black",
-)
-
-context_menu_style = dict(
-    background_color="white",
-    border="1px solid #E9E9E9",
-    border_radius="8px",
-    padding="0.5em",
-    box_shadow=shadow,
-    color="black",
-)
-
-# Update button_style to remove border-radius for regular buttons
-button_style = dict(
-    background_color="#FFFFFF",
-    border="1px solid #E9E9E9",
-    border_radius="8px",
-    padding="0.5em",
-    color="black",
+input_container_style = MappingProxyType(
+    dict(
+        border="1px solid #E9E9E9",
+        border_radius="15px",
+        padding="1em",
+        width="100%",
+        background_color="white",
+        box_shadow=shadow,
+    )
+)
+
+form_style = MappingProxyType(
+    dict(
+        display="flex",
+        flex_direction="column",
+        gap="0.75em",
+        width="100%",
+        border="none",
+        outline="none",
+        box_shadow="none",
+        _focus={"border": "none", "outline": "none", "box_shadow": "none"},
+    )
+)
+
+# The editor form is its own container, so it needs no wrapper box
+editor_form_style = MappingProxyType(
+    dict(
+        **input_container_style,
+        display="flex",
+        flex_direction="column",
+        gap="0.75em",
+    )
+)
+
+input_style = MappingProxyType(
+    dict(
+        border="none",
+        padding="0.5em",
+        width="100%",
+        color="black",
+        background_color="transparent",
+        outline="none",
+        box_shadow="none",
+        font_size="1em",
+        min_height="6em",
+        overflow_y="hidden",
+        _focus={"border": "none", "outline": "none", "box_shadow": "none"},
+        _placeholder={"color": "#A3A3A3"},
+    )
+)
+
+controls_style = MappingProxyType(
+    dict(
+        padding_top="0.5em",
+        gap="2",
+        width="100%",
+    )
+)
+
+select_style = MappingProxyType(
+    dict(
+        border="1px solid #E9E9E9",
+        padding="0.5em",
+        border_radius="1em",
+        background_color="#F5F5F5",
+        color="black",
+        width="auto",
+        min_width="150px",
+    )
+)
+
+context_menu_style = MappingProxyType(
+    dict(
+        background_color="white",
+        border="1px solid #E9E9E9",
+        border_radius="8px",
+        padding="0.5em",
+        box_shadow=shadow,
+        color="black",
+    )
+)
+
+button_style = MappingProxyType(
+    dict(
+        background_color="#FFFFFF",
+        border="1px solid #E9E9E9",
+        border_radius="8px",
+        padding="0.5em",
+        color="black",
+    )
 )
 
 # Add specific style for circular buttons (used in action bar)
-circular_button_style = dict(
-    background_color="#FFFFFF",
-    border="1px solid #E9E9E9",
-    border_radius="50%",
-    padding="0.5em",
-    aspect_ratio="1",
-    color="black",
+circular_button_style = MappingProxyType(
+    dict(
+        background_color="#FFFFFF",
+        border="1px solid #E9E9E9",
+        border_radius="50%",
+        padding="0.5em",
+        aspect_ratio="1",
+        color="black",
+    )
 )
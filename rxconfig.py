@@ -1,3 +1,5 @@
+import os
+
 import reflex as rx
 from enum import Enum
 
@@ -10,8 +12,11 @@ class LogLevel(str, Enum):
     CRITICAL = "critical"
 
 
+# Set CHATAPP_ENV=prod for deploys to build the minified production bundle.
+env = rx.Env(os.getenv("CHATAPP_ENV", rx.Env.DEV.value))
+
 config = rx.Config(
     app_name="chatapp",
-    loglevel=LogLevel.DEBUG,
-    env=rx.Env.DEV,
+    loglevel=LogLevel.DEBUG if env == rx.Env.DEV else LogLevel.INFO,
+    env=env,
 )